@@ -10,8 +10,9 @@ import pygame
 import heapq
 import random
 from dataclasses import dataclass
-from typing import List, Tuple, Set, Dict, Optional
-from collections import defaultdict
+from typing import List, Tuple, Set, Dict, Iterator, Optional
+from collections import defaultdict, deque
+from itertools import count
 
 # Constants
 GRID_SIZE = 10
@@ -30,26 +31,26 @@ GREEN = (0, 255, 0)
 YELLOW = (255, 255, 0)
 PURPLE = (128, 0, 128)
 
-@dataclass
-class SpaceTimeNode:
-    """Node in space-time search: position + time"""
-    x: int
-    y: int
-    time: int
-    
-    def __hash__(self):
-        return hash((self.x, self.y, self.time))
-    
-    def __eq__(self, other):
-        return self.x == other.x and self.y == other.y and self.time == other.time
-    
-    def __lt__(self, other):
-        # Define ordering for heapq: first by time, then by position
-        if self.time != other.time:
-            return self.time < other.time
-        if self.x != other.x:
-            return self.x < other.x
-        return self.y < other.y
+# Space-time states are packed into a single int: (time, x, y) -> key
+CELLS = GRID_SIZE * GRID_SIZE
+FREE = -1  # Unreserved slot in the vertex reservation table
+UNREACHABLE = 1 << 30  # Distance-field value for cells that cannot reach the goal
+INFINITY = 1 << 30  # g_score of states not yet reached
+PLAN_SLACK = 20  # Extra steps (waits/detours) allowed beyond the single-agent optimum
+
+# Move actions followed by the wait action, as (dx, dy, packed cell offset)
+_DELTAS = tuple((dx, dy, dx * GRID_SIZE + dy)
+                for dx, dy in ((0, 1), (1, 0), (0, -1), (-1, 0), (0, 0)))
+
+def pack_state(x: int, y: int, time: int) -> int:
+    """Pack a space-time state into a single int key"""
+    return (time * GRID_SIZE + x) * GRID_SIZE + y
+
+def unpack_state(key: int) -> Tuple[int, int, int]:
+    """Unpack a state key back into (x, y, time)"""
+    time, cell = divmod(key, CELLS)
+    x, y = divmod(cell, GRID_SIZE)
+    return x, y, time
 
 @dataclass
 class Robot:
@@ -64,126 +65,204 @@ class Robot:
 class ReservationTable:
     """Tracks reserved positions at each timestep to prevent conflicts"""
     def __init__(self):
-        # vertex_table[time][(x,y)] = agent_id
-        self.vertex_table: Dict[int, Dict[Tuple[int, int], int]] = defaultdict(dict)
-        # edge_table[time][((x1,y1),(x2,y2))] = agent_id
-        self.edge_table: Dict[int, Dict[Tuple[Tuple[int, int], Tuple[int, int]], int]] = defaultdict(dict)
+        # vertex[state_key] = agent_id, or FREE; one slot per (time, x, y)
+        self.vertex: List[int] = [FREE] * (MAX_TIME * CELLS)
+        # arrived_from[state_key] = cell the holder of that slot came from, or
+        # FREE; a slot has one holder, so this stores every reserved edge
+        self.arrived_from: List[int] = [FREE] * (MAX_TIME * CELLS)
+        # Keys reserved by each agent, so clearing never scans whole tables
+        self._vertex_by_agent: Dict[int, List[int]] = defaultdict(list)
     
-    def is_vertex_free(self, x: int, y: int, time: int, agent_id: int) -> bool:
-        """Check if position is free at given time"""
-        if (x, y) in self.vertex_table[time]:
-            return self.vertex_table[time][(x, y)] == agent_id
-        return True
+    def is_vertex_free(self, key: int, agent_id: int) -> bool:
+        """Check if the packed state is free"""
+        aid = self.vertex[key]
+        return aid == FREE or aid == agent_id
     
-    def is_edge_free(self, from_pos: Tuple[int, int], to_pos: Tuple[int, int], 
-                     time: int, agent_id: int) -> bool:
+    def is_edge_free(self, from_key: int, to_key: int, agent_id: int) -> bool:
         """Check if edge traversal is free (no swap conflict)"""
-        # Check if another agent is using the reverse edge at the same time
-        reverse_edge = (to_pos, from_pos)
-        if reverse_edge in self.edge_table[time]:
-            return self.edge_table[time][reverse_edge] == agent_id
-        return True
+        # Check if another agent arrives where we leave from, coming from
+        # where we are going, at the same time
+        from_cell = from_key % CELLS
+        to_cell = to_key % CELLS
+        reverse_key = to_key - to_cell + from_cell
+        aid = self.vertex[reverse_key]
+        return (aid == FREE or aid == agent_id or
+                self.arrived_from[reverse_key] != to_cell)
     
     def reserve_path(self, path: List[Tuple[int, int]], start_time: int, agent_id: int):
         """Reserve positions and edges along a path"""
-        for i, pos in enumerate(path):
-            t = start_time + i
-            self.vertex_table[t][pos] = agent_id
-            
+        vertex_keys = self._vertex_by_agent[agent_id]
+        prev_cell = FREE
+        for i, (x, y) in enumerate(path):
+            key = pack_state(x, y, start_time + i)
+            self.vertex[key] = agent_id
             # Reserve edge from previous position
-            if i > 0:
-                prev_pos = path[i-1]
-                edge = (prev_pos, pos)
-                self.edge_table[t][edge] = agent_id
+            self.arrived_from[key] = prev_cell
+            vertex_keys.append(key)
+            prev_cell = key % CELLS
     
     def clear_agent_reservations(self, agent_id: int):
         """Clear all reservations for a specific agent"""
-        # Clear vertex reservations
-        for time_dict in self.vertex_table.values():
-            to_remove = [pos for pos, aid in time_dict.items() if aid == agent_id]
-            for pos in to_remove:
-                del time_dict[pos]
-        
-        # Clear edge reservations
-        for time_dict in self.edge_table.values():
-            to_remove = [edge for edge, aid in time_dict.items() if aid == agent_id]
-            for edge in to_remove:
-                del time_dict[edge]
+        # Only release slots the agent still holds
+        for key in self._vertex_by_agent.pop(agent_id, ()):
+            if self.vertex[key] == agent_id:
+                self.vertex[key] = FREE
+                self.arrived_from[key] = FREE
+
+def _plan_search(start_key: int, goal_cell: int, h_field: List[int], agent_id: int,
+                 vertex: List[int], arrived_from: List[int],
+                 max_cost: int) -> Optional[Tuple[Dict[int, int], int]]:
+    """Search packed space-time states from start_key; returns (came_from, goal_key) or None."""
+    heappush = heapq.heappush
+    heappop = heapq.heappop
+    end_key = MAX_TIME * CELLS
+    
+    # Priority queue: (f_cost, g_cost, tie, key); the tie counter ends every
+    # comparison before the key, so equal costs pop in insertion order
+    tie = count()
+    open_set = [(h_field[start_key % CELLS], 0, next(tie), start_key)]
+    g_score: Dict[int, int] = {start_key: 0}
+    came_from: Dict[int, int] = {}
+    
+    while open_set and len(open_set) < 10000:  # Prevent infinite loops
+        f_cost, g_cost, _, current = heappop(open_set)
+        
+        # Skip stale entries superseded by a cheaper push
+        if g_cost > g_score[current]:
+            continue
+        
+        # Check if reached goal
+        cell = current % CELLS
+        if cell == goal_cell:
+            return came_from, current
+        
+        # Skip if exceeds max time
+        wait_key = current + CELLS
+        if wait_key >= end_key:
+            continue
+        
+        new_g_cost = g_cost + 1
+        x, y = divmod(cell, GRID_SIZE)
+        
+        # Expand neighbors
+        for dx, dy, offset in _DELTAS:
+            nx, ny = x + dx, y + dy
+            if not (0 <= nx < GRID_SIZE and 0 <= ny < GRID_SIZE):
+                continue
+            h_cost = h_field[cell + offset]
+            if new_g_cost + h_cost > max_cost:  # Also rejects UNREACHABLE cells
+                continue
+            next_key = wait_key + offset
+            
+            # Only a strictly better g is worth pushing
+            if new_g_cost >= g_score.get(next_key, INFINITY):
+                continue
+            
+            # Check vertex constraint
+            aid = vertex[next_key]
+            if aid != FREE and aid != agent_id:
+                continue
+            
+            # Check edge constraint (nobody moves next -> current at this time)
+            aid = vertex[wait_key]
+            if (aid != FREE and aid != agent_id and
+                    arrived_from[wait_key] == cell + offset):
+                continue
+            
+            g_score[next_key] = new_g_cost
+            came_from[next_key] = current
+            
+            # Add to open set
+            new_f_cost = new_g_cost + h_cost
+            heappush(open_set, (new_f_cost, new_g_cost, next(tie), next_key))
+    
+    return None  # No path found
 
 class SpaceTimeAStar:
-    """Space-Time A* planner with collision avoidance"""
-    def __init__(self, grid_size: int):
-        self.grid_size = grid_size
+    """Space-Time A* planner with collision avoidance on the GRID_SIZE grid"""
+    def __init__(self, obstacles: Optional[Set[Tuple[int, int]]] = None):
+        self.obstacles = obstacles or set()
+        # goal -> true distance to goal for every cell, filled lazily
+        self._h_cache: Dict[Tuple[int, int], List[int]] = {}
+    
+    def distance_field(self, goal: Tuple[int, int]) -> List[int]:
+        """Distance from every cell to goal around static obstacles, cached per goal"""
+        field = self._h_cache.get(goal)
+        if field is not None:
+            return field
+        
+        gx, gy = goal
+        if not self.obstacles:
+            # Open grid: the distance is plain Manhattan, no search needed
+            field = [abs(x - gx) + abs(y - gy)
+                     for x in range(GRID_SIZE) for y in range(GRID_SIZE)]
+        else:
+            field = self._bfs_field(goal)
+        
+        self._h_cache[goal] = field
+        return field
+    
+    def _bfs_field(self, goal: Tuple[int, int]) -> List[int]:
+        """Breadth-first distance field from goal, UNREACHABLE where blocked"""
+        field = [UNREACHABLE] * CELLS
+        if goal not in self.obstacles:
+            field[goal[0] * GRID_SIZE + goal[1]] = 0
+            queue = deque([goal])
+            while queue:
+                x, y = queue.popleft()
+                dist = field[x * GRID_SIZE + y] + 1
+                for dx, dy, _ in _DELTAS[:4]:
+                    nx, ny = x + dx, y + dy
+                    if (0 <= nx < GRID_SIZE and 0 <= ny < GRID_SIZE and
+                            (nx, ny) not in self.obstacles and
+                            field[nx * GRID_SIZE + ny] == UNREACHABLE):
+                        field[nx * GRID_SIZE + ny] = dist
+                        queue.append((nx, ny))
+        return field
     
     def heuristic(self, pos: Tuple[int, int], goal: Tuple[int, int]) -> int:
-        """Manhattan distance heuristic"""
-        return abs(pos[0] - goal[0]) + abs(pos[1] - goal[1])
+        """Exact single-agent distance heuristic (Manhattan on an open grid)"""
+        return self.distance_field(goal)[pos[0] * GRID_SIZE + pos[1]]
     
-    def get_neighbors(self, node: SpaceTimeNode) -> List[SpaceTimeNode]:
-        """Get valid neighbors including wait action"""
-        neighbors = []
-        
-        # Move actions
-        for dx, dy in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
-            nx, ny = node.x + dx, node.y + dy
-            if 0 <= nx < self.grid_size and 0 <= ny < self.grid_size:
-                neighbors.append(SpaceTimeNode(nx, ny, node.time + 1))
-        
-        # Wait action
-        neighbors.append(SpaceTimeNode(node.x, node.y, node.time + 1))
-        
-        return neighbors
+    def get_neighbors(self, key: int) -> Iterator[int]:
+        """Yield packed keys of valid neighbors including wait action"""
+        x, y, _ = unpack_state(key)
+        wait_key = key + CELLS
+        for dx, dy, offset in _DELTAS:
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < GRID_SIZE and 0 <= ny < GRID_SIZE:
+                yield wait_key + offset
+    
+    def reconstruct_path(self, came_from: Dict[int, int], key: int,
+                         start_time: int) -> List[Tuple[int, int]]:
+        """Walk parent pointers back from key to the start of the search"""
+        # Every step advances time by one, so the path length is known up
+        # front and the buffer is filled back to front without reversing
+        path = [None] * (key // CELLS - start_time + 1)
+        for i in range(len(path) - 1, -1, -1):
+            path[i] = divmod(key % CELLS, GRID_SIZE)
+            key = came_from.get(key)
+        return path
     
     def plan(self, start: Tuple[int, int], goal: Tuple[int, int], 
              start_time: int, agent_id: int, reservation_table: ReservationTable) -> Optional[List[Tuple[int, int]]]:
         """Find collision-free path using Space-Time A*"""
         
-        # Priority queue: (f_cost, g_cost, node, path)
-        open_set = [(0, 0, SpaceTimeNode(start[0], start[1], start_time), [])]
-        closed_set = set()
+        h_field = self.distance_field(goal)
         
-        while open_set and len(open_set) < 10000:  # Prevent infinite loops
-            f_cost, g_cost, current, path = heapq.heappop(open_set)
-            
-            # Skip if already visited
-            if current in closed_set:
-                continue
-            closed_set.add(current)
-            
-            # Check if reached goal
-            if (current.x, current.y) == goal:
-                return path + [(current.x, current.y)]
-            
-            # Expand neighbors
-            for next_node in self.get_neighbors(current):
-                # Skip if exceeds max time
-                if next_node.time >= MAX_TIME:
-                    continue
-                
-                # Skip if already visited
-                if next_node in closed_set:
-                    continue
-                
-                # Check vertex constraint
-                if not reservation_table.is_vertex_free(next_node.x, next_node.y, 
-                                                       next_node.time, agent_id):
-                    continue
-                
-                # Check edge constraint (no swapping)
-                current_pos = (current.x, current.y)
-                next_pos = (next_node.x, next_node.y)
-                if not reservation_table.is_edge_free(current_pos, next_pos, 
-                                                     next_node.time, agent_id):
-                    continue
-                
-                # Calculate costs
-                new_g_cost = g_cost + 1
-                h_cost = self.heuristic((next_node.x, next_node.y), goal)
-                new_f_cost = new_g_cost + h_cost
-                
-                # Add to open set
-                new_path = path + [(current.x, current.y)]
-                heapq.heappush(open_set, (new_f_cost, new_g_cost, next_node, new_path))
+        # Reject plans that cannot fit in the horizon even without other agents
+        min_steps = h_field[start[0] * GRID_SIZE + start[1]]
+        if min_steps == UNREACHABLE or start_time + min_steps >= MAX_TIME:
+            return None
+        
+        start_key = pack_state(start[0], start[1], start_time)
+        result = _plan_search(start_key, goal[0] * GRID_SIZE + goal[1],
+                              h_field, agent_id,
+                              reservation_table.vertex, reservation_table.arrived_from,
+                              min_steps + PLAN_SLACK)
+        if result is not None:
+            came_from, goal_key = result
+            return self.reconstruct_path(came_from, goal_key, start_time)
         
         return None  # No path found
 
@@ -202,10 +281,34 @@ class MAPFSimulator:
             Robot(3, (5, 5), (5, 0), (5, 5), [], PURPLE, 3)
         ]
         
-        self.planner = SpaceTimeAStar(GRID_SIZE)
+        # Fonts and robot ID glyphs are built once, not every frame
+        self._font_id = pygame.font.Font(None, 24)
+        self._font_info = pygame.font.Font(None, 20)
+        self._id_surfs = {r.id: self._font_id.render(str(r.id), True, WHITE) for r in self.robots}
+        # Info lines: slot -> (text, surface), re-rendered only when text changes
+        self._text_cache: Dict[str, Tuple[str, pygame.Surface]] = {}
+        
+        # Empty grid is static: draw it once and blit it every frame
+        self._bg = pygame.Surface((WINDOW_SIZE, WINDOW_SIZE))
+        self._bg.fill(WHITE)
+        for x in range(GRID_SIZE):
+            for y in range(GRID_SIZE):
+                rect = pygame.Rect(x * CELL_SIZE, y * CELL_SIZE, CELL_SIZE, CELL_SIZE)
+                pygame.draw.rect(self._bg, GRAY, rect, 1)
+        
+        self._all_cells = [(x, y) for x in range(GRID_SIZE) for y in range(GRID_SIZE)]
+        self.planner = SpaceTimeAStar()
         self.reservation_table = ReservationTable()
         self.time_step = 0
         
+        # Robots that moved out of the way, mapped to the step they may return
+        self.robots_waiting: Dict[int, int] = {}
+        # Per-tick robot state, refreshed as robots move
+        self._positions: Dict[int, Tuple[int, int]] = {r.id: r.pos for r in self.robots}
+        self._at_goal: Set[int] = set()
+        self._moving: Set[int] = set()
+        self._future_pos: Dict[int, List[int]] = {}  # packed state key -> robot ids
+        
         # Plan initial paths
         self.plan_all_paths()
     
@@ -234,13 +337,17 @@ class MAPFSimulator:
             else:
                 print(f"Robot {robot.id}: No collision-free path found!")
         
+        # Index planned positions by packed (timestep, cell) for the blocking check
+        self._future_pos = {}
+        for robot in self.robots:
+            for t, (x, y) in enumerate(robot.path):
+                self._future_pos.setdefault(pack_state(x, y, t), []).append(robot.id)
+        
     def move_robots(self):
         """Move robots along their paths"""
         any_robot_moving = False
-        
-        # Track robots that moved out of the way last timestep
-        if not hasattr(self, 'robots_waiting'):
-            self.robots_waiting = {}
+        self._at_goal.clear()
+        self._moving.clear()
         
         # Move each robot based on their current state
         for robot in self.robots:
@@ -261,33 +368,40 @@ class MAPFSimulator:
             else:
                 # Robot has reached goal and is not waiting - stay at goal
                 robot.pos = robot.goal
-        
-        # Now check for potential collisions and move robots out of the way
-        robots_at_goal = [r for r in self.robots if r.pos == r.goal and r.id not in self.robots_waiting]
-        robots_moving = [r for r in self.robots if r.pos != r.goal and r.path]
-        
-        for blocking_robot in robots_at_goal:
-            for moving_robot in robots_moving:
-                future_steps = min(5, len(moving_robot.path) - self.time_step)
-                for i in range(1, future_steps + 1):
-                    if (self.time_step + i < len(moving_robot.path) and 
-                        moving_robot.path[self.time_step + i] == blocking_robot.pos):
-                        
-                        if i == 1:  # Collision would happen in the next timestep
-                            # Find an adjacent empty cell to move to
-                            current_positions = {r.pos for r in self.robots}
-                            for dx, dy in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
-                                new_x = blocking_robot.pos[0] + dx
-                                new_y = blocking_robot.pos[1] + dy
-                                new_pos = (new_x, new_y)
-                                
-                                if (0 <= new_x < GRID_SIZE and 0 <= new_y < GRID_SIZE and 
-                                    new_pos not in current_positions):
-                                    blocking_robot.pos = new_pos
-                                    self.robots_waiting[blocking_robot.id] = self.time_step + 2
-                                    print(f"Robot {blocking_robot.id} moved out of the way to {new_pos}")
-                                    break
-                            break
+            
+            self._positions[robot.id] = robot.pos
+            if robot.pos == robot.goal:
+                if robot.id not in self.robots_waiting:
+                    self._at_goal.add(robot.id)
+            elif robot.path:
+                self._moving.add(robot.id)
+        
+        # Now check for potential collisions and move robots out of the way:
+        # a robot resting at its goal steps aside if a moving robot's path
+        # enters its cell on the next timestep
+        next_step = self.time_step + 1
+        for blocking_robot in self.robots:
+            if blocking_robot.id not in self._at_goal:
+                continue
+            
+            bx, by = blocking_robot.pos
+            arriving = self._future_pos.get(pack_state(bx, by, next_step), ())
+            if not any(robot_id in self._moving for robot_id in arriving):
+                continue
+            
+            # Find an adjacent empty cell to move to
+            for dx, dy in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
+                new_x = blocking_robot.pos[0] + dx
+                new_y = blocking_robot.pos[1] + dy
+                new_pos = (new_x, new_y)
+                
+                if (0 <= new_x < GRID_SIZE and 0 <= new_y < GRID_SIZE and 
+                    new_pos not in self._positions.values()):
+                    blocking_robot.pos = new_pos
+                    self._positions[blocking_robot.id] = new_pos
+                    self.robots_waiting[blocking_robot.id] = self.time_step + 2
+                    print(f"Robot {blocking_robot.id} moved out of the way to {new_pos}")
+                    break
         
         self.time_step += 1
         
@@ -298,16 +412,13 @@ class MAPFSimulator:
         """Generate new random goals and replan"""
         occupied = {robot.pos for robot in self.robots}
         
-        for robot in self.robots:
-            # Find free positions
-            free_positions = [(x, y) for x in range(GRID_SIZE) 
-                            for y in range(GRID_SIZE) 
-                            if (x, y) not in occupied]
-            
-            if free_positions:
-                robot.start = robot.pos
-                robot.goal = random.choice(free_positions)
-                occupied.add(robot.goal)
+        # Find free positions once and draw distinct goals from them
+        free_positions = [cell for cell in self._all_cells if cell not in occupied]
+        goals = random.sample(free_positions, min(len(free_positions), len(self.robots)))
+        
+        for robot, goal in zip(self.robots, goals):
+            robot.start = robot.pos
+            robot.goal = goal
         
         # Replan all paths
         self.plan_all_paths()
@@ -322,15 +433,18 @@ class MAPFSimulator:
             positions[robot.pos] = robot.id
         return True
     
+    def _render_info(self, slot: str, text: str, color: Tuple[int, int, int]) -> pygame.Surface:
+        """Render an info line, reusing the last surface while its text is unchanged"""
+        cached = self._text_cache.get(slot)
+        if cached is None or cached[0] != text:
+            cached = (text, self._font_info.render(text, True, color))
+            self._text_cache[slot] = cached
+        return cached[1]
+    
     def draw(self):
         """Draw the grid and robots"""
-        self.screen.fill(WHITE)
-        
-        # Draw grid
-        for x in range(GRID_SIZE):
-            for y in range(GRID_SIZE):
-                rect = pygame.Rect(x * CELL_SIZE, y * CELL_SIZE, CELL_SIZE, CELL_SIZE)
-                pygame.draw.rect(self.screen, GRAY, rect, 1)
+        # Draw the static grid background
+        self.screen.blit(self._bg, (0, 0))
         
         # Draw goals
         for robot in self.robots:
@@ -360,15 +474,13 @@ class MAPFSimulator:
             pygame.draw.circle(self.screen, BLACK, center, 18, 2)
             
             # Draw robot ID
-            font = pygame.font.Font(None, 24)
-            text = font.render(str(robot.id), True, WHITE)
+            text = self._id_surfs[robot.id]
             text_rect = text.get_rect(center=center)
             self.screen.blit(text, text_rect)
         
         # Draw info
-        font = pygame.font.Font(None, 20)
         info_text = f"Time: {self.time_step} | Space-Time A* with Priority Planning"
-        text = font.render(info_text, True, BLACK)
+        text = self._render_info("info", info_text, BLACK)
         self.screen.blit(text, (10, 10))
         
         # Check and display collision status
@@ -379,7 +491,7 @@ class MAPFSimulator:
             status_text = "COLLISION DETECTED!"
             color = RED
         
-        text = font.render(status_text, True, color)
+        text = self._render_info("status", status_text, color)
         self.screen.blit(text, (10, 30))
         
         pygame.display.flip()
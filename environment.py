@@ -3,9 +3,10 @@ Environment module for MAPF simulation.
 Defines the grid layout, robots, and basic structures.
 """
 
-from typing import List, Tuple, Optional, NamedTuple
+from typing import Dict, List, Tuple, Optional, NamedTuple
 from dataclasses import dataclass
 from enum import Enum
+from collections import deque
 
 # Grid constants
 GRID_WIDTH = 5
@@ -66,6 +67,23 @@ class Environment:
         self.width = GRID_WIDTH
         self.height = GRID_HEIGHT
         self.rooms = ROOMS
+        
+        # Valid (next_position, cost) moves from every position, built once
+        self._neighbors: Dict[Position, Tuple[Tuple[Position, int], ...]] = {}
+        for row in range(self.height):
+            for col in range(self.width):
+                pos = Position(row, col)
+                self._neighbors[pos] = tuple(self.get_valid_moves(pos))
+        
+        # Lookup tables for every (current, goal) pair,
+        # indexed [current.row][current.col][goal.row][goal.col]
+        self._distances = [[self._distance_field(Position(row, col))
+                            for col in range(self.width)]
+                           for row in range(self.height)]
+        self._manhattan = [[[[abs(r1 - r2) + abs(c1 - c2) for c2 in range(self.width)]
+                             for r2 in range(self.height)]
+                            for c1 in range(self.width)]
+                           for r1 in range(self.height)]
     
     def get_position_name(self, row: int, col: int) -> str:
         """Convert position to name."""
@@ -108,14 +126,27 @@ class Environment:
         
         return moves
     
+    def get_neighbors(self, pos: Position) -> Tuple[Tuple[Position, int], ...]:
+        """Get precomputed valid moves from a position with costs."""
+        return self._neighbors[pos]
+    
+    def _distance_field(self, goal: Position) -> List[List[int]]:
+        """BFS distance from every position to goal (moves are symmetric)."""
+        field = [[-1] * self.width for _ in range(self.height)]
+        field[goal.row][goal.col] = 0
+        queue = deque([goal])
+        while queue:
+            pos = queue.popleft()
+            for next_pos, move_cost in self.get_neighbors(pos):
+                if field[next_pos.row][next_pos.col] == -1:
+                    field[next_pos.row][next_pos.col] = field[pos.row][pos.col] + move_cost
+                    queue.append(next_pos)
+        return field
+    
     def manhattan_distance(self, pos1: Position, pos2: Position) -> int:
         """Calculate Manhattan distance between two positions."""
-        return abs(pos1.row - pos2.row) + abs(pos1.col - pos2.col)
+        return self._manhattan[pos1.row][pos1.col][pos2.row][pos2.col]
     
     def heuristic(self, current: Position, goal: Position) -> int:
-        """Heuristic function for A* pathfinding."""
-        if goal.row == 0:  # Goal is a room
-            corridor_steps = abs(current.col - goal.col)  # Horizontal corridor movement
-            room_steps = 1 if current.row == 0 else 2  # Steps to access room
-            return corridor_steps + room_steps
-        return self.manhattan_distance(current, goal)
\ No newline at end of file
+        """Heuristic function for A* pathfinding (exact precomputed distance)."""
+        return self._distances[current.row][current.col][goal.row][goal.col]
\ No newline at end of file
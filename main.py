@@ -9,6 +9,14 @@ import sys
 from simulator import MAPFSimulator
 from renderer import MAPFRenderer
 
+# Event posted by the pygame timer each time a simulation step is due
+SIMULATION_STEP_EVENT = pygame.USEREVENT + 1
+
+def set_step_timer(simulator: MAPFSimulator) -> None:
+    """Post SIMULATION_STEP_EVENT every update_interval while running, else stop it."""
+    interval_ms = int(simulator.update_interval * 1000) if simulator.is_running else 0
+    pygame.time.set_timer(SIMULATION_STEP_EVENT, interval_ms)
+
 def main():
     """Main function to run the MAPF simulation."""
     # Initialize pygame
@@ -34,19 +42,24 @@ def main():
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
+            elif event.type == pygame.VIDEOEXPOSE:
+                # Window uncovered or restored: repaint everything
+                renderer.invalidate()
+            elif event.type == SIMULATION_STEP_EVENT:
+                # Update simulation
+                simulator.update()
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
                     running = False
                 elif event.key == pygame.K_SPACE:
                     simulator.toggle_simulation()
+                    set_step_timer(simulator)
                 elif event.key == pygame.K_r:
                     simulator.reset()
+                    set_step_timer(simulator)
                 elif event.key == pygame.K_o:
                     simulator.add_manual_order()
         
-        # Update simulation
-        simulator.update()
-        
         # Render
         renderer.render()
         
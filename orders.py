@@ -4,7 +4,8 @@ Handles order generation, assignment, and tracking.
 """
 
 import random
-from typing import List, Optional
+from itertools import chain, islice
+from typing import Dict, Iterator, List, Optional
 from environment import Environment, Order, Robot, OrderStatus, Position
 
 class OrderManager:
@@ -12,9 +13,11 @@ class OrderManager:
     
     def __init__(self, environment: Environment):
         self.env = environment
-        self.orders: List[Order] = []
+        self.orders: Dict[int, Order] = {}  # Active orders by id, in arrival order
         self.completed_orders: List[Order] = []
+        self._by_robot: Dict[int, int] = {}  # robot_id -> assigned order id
         self.next_order_id = 1
+        self.dirty = True  # Set whenever the order book changes
     
     def generate_random_order(self, current_time: int) -> Order:
         """Generate a random order between two different rooms."""
@@ -33,8 +36,9 @@ class OrderManager:
             status=OrderStatus.PENDING
         )
         
-        self.orders.append(order)
+        self.orders[order.id] = order
         self.next_order_id += 1
+        self.dirty = True
         
         return order
     
@@ -44,17 +48,33 @@ class OrderManager:
     
     def get_pending_orders(self) -> List[Order]:
         """Get all pending orders."""
-        return [order for order in self.orders if order.status == OrderStatus.PENDING]
+        return [order for order in self.orders.values() if order.status == OrderStatus.PENDING]
     
     def get_assigned_orders(self) -> List[Order]:
         """Get all assigned orders."""
-        return [order for order in self.orders if order.status == OrderStatus.ASSIGNED]
+        return [order for order in self.orders.values() if order.status == OrderStatus.ASSIGNED]
+    
+    @property
+    def active_count(self) -> int:
+        """Number of pending and assigned orders (completed ones leave self.orders)."""
+        return len(self.orders)
+    
+    def iter_active(self, limit: Optional[int] = None) -> Iterator[Order]:
+        """Iterate pending orders, then assigned ones, stopping after limit orders."""
+        orders = self.orders.values()
+        active = chain(
+            (order for order in orders if order.status == OrderStatus.PENDING),
+            (order for order in orders if order.status == OrderStatus.ASSIGNED)
+        )
+        return islice(active, limit)
     
     def assign_order_to_robot(self, order: Order, robot: Robot, current_time: int) -> None:
         """Assign an order to a robot."""
         order.status = OrderStatus.ASSIGNED
         order.assigned_robot = robot.id
         order.start_time = current_time
+        self._by_robot[robot.id] = order.id
+        self.dirty = True
     
     def complete_order(self, order: Order, current_time: int) -> None:
         """Mark an order as completed."""
@@ -64,14 +84,17 @@ class OrderManager:
         
         # Move to completed orders and remove from active orders
         self.completed_orders.append(order)
-        self.orders.remove(order)
+        del self.orders[order.id]
+        if self._by_robot.get(order.assigned_robot) == order.id:
+            del self._by_robot[order.assigned_robot]
+        self.dirty = True
     
     def find_order_by_robot(self, robot_id: int) -> Optional[Order]:
         """Find the order assigned to a specific robot."""
-        for order in self.orders:
-            if order.assigned_robot == robot_id and order.status == OrderStatus.ASSIGNED:
-                return order
-        return None
+        order_id = self._by_robot.get(robot_id)
+        if order_id is None:
+            return None
+        return self.orders.get(order_id)
     
     def get_best_robot_for_order(self, order: Order, available_robots: List[Robot]) -> Optional[Robot]:
         """
@@ -91,26 +114,17 @@ class OrderManager:
         if not from_room_pos:
             return None
         
-        # Calculate distances for each robot
-        robot_distances = []
-        for robot in available_robots:
-            # Distance = steps to get under pickup room + steps to enter room
-            corridor_distance = abs(robot.col - from_room_pos.col)
-            room_access_distance = 1 if robot.row == 1 else 2  # Already in corridor vs in room
-            total_distance = corridor_distance + room_access_distance
-            
-            robot_distances.append((robot, total_distance))
-        
-        # Sort by distance, then by priority (lower priority number = higher priority)
-        robot_distances.sort(key=lambda x: (x[1], x[0].priority))
-        
-        return robot_distances[0][0]
+        # Closest robot to the pickup room, then by priority (lower priority number = higher priority)
+        return min(available_robots,
+                   key=lambda robot: (self.env.heuristic(robot.position, from_room_pos), robot.priority))
     
     def reset(self) -> None:
         """Reset all orders."""
         self.orders.clear()
         self.completed_orders.clear()
+        self._by_robot.clear()
         self.next_order_id = 1
+        self.dirty = True
     
     def get_statistics(self) -> dict:
         """Get order statistics."""
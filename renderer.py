@@ -5,6 +5,7 @@ Handles all graphics and user interface rendering.
 
 import pygame
 import pygame.font
+from collections import OrderedDict
 from typing import Tuple, List
 from environment import Position, RobotStatus
 from simulator import MAPFSimulator
@@ -24,12 +25,22 @@ YELLOW = (255, 255, 0)
 PURPLE = (128, 0, 128)
 ORANGE = (255, 165, 0)
 
+# Maximum number of dynamic text surfaces kept for reuse
+TEXT_CACHE_SIZE = 256
+
 # Robot colors
 ROBOT_COLORS = {
     1: BLUE,
     2: RED
 }
 
+# Robot and path marker radii, and the highest step number pre-rendered
+ROOM_ROBOT_RADIUS = 20
+CORRIDOR_ROBOT_RADIUS = 16
+STEP_RADIUS = 8
+WAITING_RADIUS = 6
+PRERENDERED_STEPS = 20
+
 class MAPFRenderer:
     """Pygame renderer for the MAPF simulation."""
     
@@ -55,31 +66,130 @@ class MAPFRenderer:
         self.font_medium = pygame.font.Font(None, 20)
         self.font_small = pygame.font.Font(None, 16)
         self.font_tiny = pygame.font.Font(None, 12)
+        
+        # Panel labels that never change, rendered once
+        self._static_text = {
+            title: self.font_medium.render(title, True, BLACK)
+            for title in ("Time Elapsed", "Active Orders", "Completed Orders",
+                          "Current Orders", "Robot Status")
+        }
+        self._static_text["No active orders"] = self.font_small.render("No active orders", True, GRAY)
+        
+        # Dynamic labels: (font, text, color) -> surface, least recently used first
+        self._text_cache = OrderedDict()
+        
+        # Sprites for robots, (robot_id, in_room) -> surface, and path steps,
+        # (robot_id, step_number) -> surface; other ids and steps are added
+        # the first time they are drawn
+        self._robot_sprites = {}
+        self._step_sprites = {}
+        for robot_id in ROBOT_COLORS:
+            for in_room in (True, False):
+                self._robot_sprite(robot_id, in_room)
+            for step in range(1, PRERENDERED_STEPS + 1):
+                self._step_sprite(robot_id, step)
+        self._waiting_sprite = pygame.Surface((2 * WAITING_RADIUS, 2 * WAITING_RADIUS), pygame.SRCALPHA)
+        pygame.draw.circle(self._waiting_sprite, YELLOW, (WAITING_RADIUS, WAITING_RADIUS), WAITING_RADIUS)
+        
+        # Static layer (grid and instructions), drawn once and blitted per redraw
+        self._background = pygame.Surface((self.window_width, self.window_height))
+        self._background.fill(WHITE)
+        self._draw_grid(self._background)
+        self._draw_instructions(self._background)
+        
+        # Orders and robot status panels, redrawn only when their contents change
+        self._orders_surf = pygame.Surface((400, 200))
+        self._robot_surf = pygame.Surface((300, 200))
+        self.simulator.order_manager.dirty = True
+        self.simulator.robots_dirty = True
+        
+        # Screen areas covered by robots and path indicators last redraw
+        self._prev_robot_rects: List[pygame.Rect] = []
+        self._full_redraw = True
     
     def render(self) -> None:
-        """Main render method."""
-        self.screen.fill(WHITE)
+        """Main render method; redraws only when the simulation changed."""
+        if not self.simulator.dirty:
+            return
         
-        # Draw grid
-        self._draw_grid()
+        # Draw grid and instructions
+        self.screen.blit(self._background, (0, 0))
         
         # Draw robots
-        self._draw_robots()
+        robot_rects = self._draw_robots()
         
         # Draw path indicators
-        self._draw_path_indicators()
+        robot_rects += self._draw_path_indicators()
         
         # Draw UI panels
-        self._draw_status_panel()
-        self._draw_orders_panel()
-        self._draw_robot_status_panel()
+        panel_rects = [
+            self._draw_status_panel(),
+            self._draw_orders_panel(),
+            self._draw_robot_status_panel()
+        ]
         
-        # Draw instructions
-        self._draw_instructions()
+        if self._full_redraw:
+            pygame.display.flip()
+            self._full_redraw = False
+        else:
+            # Push only areas that can change: old and new robot/path marks
+            # plus the panels
+            pygame.display.update(self._prev_robot_rects + robot_rects + panel_rects)
         
-        pygame.display.flip()
+        self._prev_robot_rects = robot_rects
+        self.simulator.dirty = False
+    
+    def invalidate(self) -> None:
+        """Force a full redraw on the next render, e.g. after the window was exposed."""
+        self.simulator.dirty = True
+        self._full_redraw = True
+    
+    def _render_text(self, font: pygame.font.Font, text: str,
+                     color: Tuple[int, int, int]) -> pygame.Surface:
+        """Render text, reusing surfaces for recently drawn labels."""
+        key = (font, text, color)
+        surface = self._text_cache.get(key)
+        if surface is None:
+            surface = font.render(text, True, color)
+            self._text_cache[key] = surface
+            if len(self._text_cache) > TEXT_CACHE_SIZE:
+                self._text_cache.popitem(last=False)
+        else:
+            self._text_cache.move_to_end(key)
+        return surface
+    
+    def _robot_sprite(self, robot_id: int, in_room: bool) -> pygame.Surface:
+        """Get the robot body and ID label, rendered once per robot and size."""
+        key = (robot_id, in_room)
+        sprite = self._robot_sprites.get(key)
+        if sprite is None:
+            radius = ROOM_ROBOT_RADIUS if in_room else CORRIDOR_ROBOT_RADIUS
+            sprite = self._circle_sprite(ROBOT_COLORS.get(robot_id, BLACK), radius, 2,
+                                         self.font_medium.render(f"R{robot_id}", True, WHITE))
+            self._robot_sprites[key] = sprite
+        return sprite
+    
+    def _step_sprite(self, robot_id: int, step: int) -> pygame.Surface:
+        """Get a numbered path step marker, rendered once per robot and step."""
+        key = (robot_id, step)
+        sprite = self._step_sprites.get(key)
+        if sprite is None:
+            sprite = self._circle_sprite(ROBOT_COLORS.get(robot_id, BLACK), STEP_RADIUS, 1,
+                                         self.font_tiny.render(str(step), True, WHITE))
+            self._step_sprites[key] = sprite
+        return sprite
+    
+    @staticmethod
+    def _circle_sprite(color: Tuple[int, int, int], radius: int, border: int,
+                       label: pygame.Surface) -> pygame.Surface:
+        """Render a filled, black-outlined circle with a centered label."""
+        sprite = pygame.Surface((2 * radius, 2 * radius), pygame.SRCALPHA)
+        pygame.draw.circle(sprite, color, (radius, radius), radius)
+        pygame.draw.circle(sprite, BLACK, (radius, radius), radius, border)
+        sprite.blit(label, label.get_rect(center=(radius, radius)))
+        return sprite
     
-    def _draw_grid(self) -> None:
+    def _draw_grid(self, surface: pygame.Surface) -> None:
         """Draw the corridor and rooms grid."""
         # Draw rooms (top row)
         for col in range(5):
@@ -88,14 +198,14 @@ class MAPFRenderer:
             
             # Room background
             room_rect = pygame.Rect(x, y, self.cell_width, self.room_height)
-            pygame.draw.rect(self.screen, LIGHT_GREEN, room_rect)
-            pygame.draw.rect(self.screen, BLACK, room_rect, 3)
+            pygame.draw.rect(surface, LIGHT_GREEN, room_rect)
+            pygame.draw.rect(surface, BLACK, room_rect, 3)
             
             # Room label
             room_name = self.simulator.env.rooms[col]
             text = self.font_medium.render(room_name, True, BLACK)
             text_rect = text.get_rect(center=(x + self.cell_width // 2, y + 20))
-            self.screen.blit(text, text_rect)
+            surface.blit(text, text_rect)
         
         # Draw corridor (bottom row)
         for col in range(5):
@@ -104,54 +214,50 @@ class MAPFRenderer:
             
             # Corridor background
             corridor_rect = pygame.Rect(x, y, self.cell_width, self.cell_height)
-            pygame.draw.rect(self.screen, LIGHT_BLUE, corridor_rect)
-            pygame.draw.rect(self.screen, GRAY, corridor_rect, 2)
+            pygame.draw.rect(surface, LIGHT_BLUE, corridor_rect)
+            pygame.draw.rect(surface, GRAY, corridor_rect, 2)
             
             # Position number
             text = self.font_small.render(str(col), True, DARK_GRAY)
-            self.screen.blit(text, (x + 5, y + 5))
+            surface.blit(text, (x + 5, y + 5))
     
-    def _draw_robots(self) -> None:
-        """Draw robots on the grid."""
-        for robot in self.simulator.robots:
-            self._draw_robot(robot)
+    def _draw_robots(self) -> List[pygame.Rect]:
+        """Draw robots on the grid; returns the screen areas touched."""
+        return [self._draw_robot(robot) for robot in self.simulator.robots]
     
-    def _draw_robot(self, robot) -> None:
-        """Draw a single robot."""
+    def _draw_robot(self, robot) -> pygame.Rect:
+        """Draw a single robot; returns the screen area touched."""
         pos = robot.position
         x = self.grid_start_x + pos.col * self.cell_width + self.cell_width // 2
         
         if pos.row == 0:  # Room
             y = self.grid_start_y + self.room_height // 2
-            radius = 20
         else:  # Corridor
             y = self.grid_start_y + self.room_height + self.cell_height // 2
-            radius = 16
-        
-        # Robot circle
-        color = ROBOT_COLORS.get(robot.id, BLACK)
-        pygame.draw.circle(self.screen, color, (x, y), radius)
-        pygame.draw.circle(self.screen, BLACK, (x, y), radius, 2)
         
-        # Robot ID
-        text = self.font_medium.render(f"R{robot.id}", True, WHITE)
-        text_rect = text.get_rect(center=(x, y))
-        self.screen.blit(text, text_rect)
+        # Robot circle with ID
+        sprite = self._robot_sprite(robot.id, pos.row == 0)
+        rect = self.screen.blit(sprite, sprite.get_rect(center=(x, y)))
         
         # Waiting indicator
         if robot.is_waiting:
-            pygame.draw.circle(self.screen, YELLOW, (x + 15, y - 15), 6)
+            waiting_rect = self._waiting_sprite.get_rect(center=(x + 15, y - 15))
+            rect = rect.union(self.screen.blit(self._waiting_sprite, waiting_rect))
+        
+        return rect
     
-    def _draw_path_indicators(self) -> None:
-        """Draw path step indicators for robots."""
+    def _draw_path_indicators(self) -> List[pygame.Rect]:
+        """Draw path step indicators for robots; returns the screen areas touched."""
+        markers = []
         for robot in self.simulator.robots:
             if not robot.path or robot.status == RobotStatus.IDLE:
                 continue
             
-            remaining_path = robot.path[robot.path_index:]
-            color = ROBOT_COLORS.get(robot.id, BLACK)
-            
-            for i, pos in enumerate(remaining_path):
+            # Walk the remaining path in place rather than slicing a copy
+            for index in range(robot.path_index, len(robot.path)):
+                pos = robot.path[index]
+                i = index - robot.path_index
+                
                 # Skip current position
                 if pos == robot.position:
                     continue
@@ -163,39 +269,38 @@ class MAPFRenderer:
                 else:  # Corridor
                     y = self.grid_start_y + self.room_height + self.cell_height - 20
                 
-                # Path step circle
-                pygame.draw.circle(self.screen, color, (x, y), 8)
-                pygame.draw.circle(self.screen, BLACK, (x, y), 8, 1)
-                
-                # Step number
-                step_text = self.font_tiny.render(str(i + 1), True, WHITE)
-                step_rect = step_text.get_rect(center=(x, y))
-                self.screen.blit(step_text, step_rect)
+                # Numbered path step circle
+                markers.append((self._step_sprite(robot.id, i + 1),
+                                (x - STEP_RADIUS, y - STEP_RADIUS)))
+        
+        # Submit all markers in one call
+        return self.screen.blits(markers)
     
-    def _draw_status_panel(self) -> None:
-        """Draw the main status panel."""
+    def _draw_status_panel(self) -> pygame.Rect:
+        """Draw the main status panel; returns its screen area."""
         panel_x = self.grid_start_x + 5 * self.cell_width + 50
         panel_y = self.grid_start_y
         panel_width = 300
         
         # Time elapsed
-        self._draw_status_box("Time Elapsed", f"{self.simulator.time_elapsed}s", 
+        time_rect = self._draw_status_box("Time Elapsed", f"{self.simulator.time_elapsed}s", 
                              panel_x, panel_y, panel_width, LIGHT_BLUE)
         
         # Active orders
-        active_orders = len(self.simulator.order_manager.get_pending_orders()) + \
-                       len(self.simulator.order_manager.get_assigned_orders())
+        active_orders = self.simulator.order_manager.active_count
         self._draw_status_box("Active Orders", str(active_orders), 
                              panel_x, panel_y + 80, panel_width, (255, 255, 200))
         
         # Completed orders
         completed_orders = len(self.simulator.order_manager.completed_orders)
-        self._draw_status_box("Completed Orders", str(completed_orders), 
-                             panel_x, panel_y + 160, panel_width, LIGHT_GREEN)
+        completed_rect = self._draw_status_box("Completed Orders", str(completed_orders), 
+                                               panel_x, panel_y + 160, panel_width, LIGHT_GREEN)
+        
+        return time_rect.union(completed_rect)
     
     def _draw_status_box(self, title: str, value: str, x: int, y: int, 
-                        width: int, color: Tuple[int, int, int]) -> None:
-        """Draw a status box with title and value."""
+                        width: int, color: Tuple[int, int, int]) -> pygame.Rect:
+        """Draw a status box with title and value; returns its screen area."""
         height = 60
         
         # Background
@@ -204,45 +309,54 @@ class MAPFRenderer:
         pygame.draw.rect(self.screen, BLACK, rect, 2)
         
         # Title
-        title_text = self.font_medium.render(title, True, BLACK)
+        title_text = self._static_text[title]
         self.screen.blit(title_text, (x + 10, y + 10))
         
         # Value
-        value_text = self.font_large.render(value, True, BLACK)
+        value_text = self._render_text(self.font_large, value, BLACK)
         self.screen.blit(value_text, (x + 10, y + 30))
+        
+        return rect
     
-    def _draw_orders_panel(self) -> None:
-        """Draw the orders panel."""
+    def _draw_orders_panel(self) -> pygame.Rect:
+        """Draw the orders panel; returns its screen area."""
         panel_x = self.grid_start_x
         panel_y = self.grid_start_y + self.room_height + self.cell_height + 50
-        panel_width = 400
-        panel_height = 200
         
+        # Redraw the cached panel only when the order book changed
+        order_manager = self.simulator.order_manager
+        if order_manager.dirty:
+            self._render_orders_panel(self._orders_surf)
+            order_manager.dirty = False
+        
+        return self.screen.blit(self._orders_surf, (panel_x, panel_y))
+    
+    def _render_orders_panel(self, surface: pygame.Surface) -> None:
+        """Draw the orders panel contents onto its own surface."""
         # Panel background
-        panel_rect = pygame.Rect(panel_x, panel_y, panel_width, panel_height)
-        pygame.draw.rect(self.screen, LIGHT_GRAY, panel_rect)
-        pygame.draw.rect(self.screen, BLACK, panel_rect, 2)
+        panel_rect = surface.get_rect()
+        pygame.draw.rect(surface, LIGHT_GRAY, panel_rect)
+        pygame.draw.rect(surface, BLACK, panel_rect, 2)
         
         # Title
-        title_text = self.font_medium.render("Current Orders", True, BLACK)
-        self.screen.blit(title_text, (panel_x + 10, panel_y + 10))
+        title_text = self._static_text["Current Orders"]
+        surface.blit(title_text, (10, 10))
         
         # Orders list
         y_offset = 40
-        all_orders = (self.simulator.order_manager.get_pending_orders() + 
-                     self.simulator.order_manager.get_assigned_orders())
+        order_manager = self.simulator.order_manager
         
-        if not all_orders:
-            no_orders_text = self.font_small.render("No active orders", True, GRAY)
-            self.screen.blit(no_orders_text, (panel_x + 10, panel_y + y_offset))
+        if not order_manager.active_count:
+            no_orders_text = self._static_text["No active orders"]
+            surface.blit(no_orders_text, (10, y_offset))
         else:
-            for i, order in enumerate(all_orders[:5]):  # Show max 5 orders
-                order_y = panel_y + y_offset + i * 30
+            for i, order in enumerate(order_manager.iter_active(limit=5)):  # Show max 5 orders
+                order_y = y_offset + i * 30
                 
                 # Order info
                 order_text = f"#{order.id}: {order.from_room} → {order.to_room}"
-                text = self.font_small.render(order_text, True, BLACK)
-                self.screen.blit(text, (panel_x + 10, order_y))
+                text = self._render_text(self.font_small, order_text, BLACK)
+                surface.blit(text, (10, order_y))
                 
                 # Status
                 if order.assigned_robot:
@@ -252,37 +366,44 @@ class MAPFRenderer:
                     status_text = "Pending"
                     status_color = ORANGE
                 
-                status = self.font_tiny.render(status_text, True, status_color)
-                self.screen.blit(status, (panel_x + 250, order_y))
+                status = self._render_text(self.font_tiny, status_text, status_color)
+                surface.blit(status, (250, order_y))
     
-    def _draw_robot_status_panel(self) -> None:
-        """Draw the robot status panel."""
+    def _draw_robot_status_panel(self) -> pygame.Rect:
+        """Draw the robot status panel; returns its screen area."""
         panel_x = self.grid_start_x + 450
         panel_y = self.grid_start_y + self.room_height + self.cell_height + 50
-        panel_width = 300
-        panel_height = 200
         
+        # Redraw the cached panel only when a robot changed
+        if self.simulator.robots_dirty:
+            self._render_robot_status_panel(self._robot_surf)
+            self.simulator.robots_dirty = False
+        
+        return self.screen.blit(self._robot_surf, (panel_x, panel_y))
+    
+    def _render_robot_status_panel(self, surface: pygame.Surface) -> None:
+        """Draw the robot status panel contents onto its own surface."""
         # Panel background
-        panel_rect = pygame.Rect(panel_x, panel_y, panel_width, panel_height)
-        pygame.draw.rect(self.screen, LIGHT_GRAY, panel_rect)
-        pygame.draw.rect(self.screen, BLACK, panel_rect, 2)
+        panel_rect = surface.get_rect()
+        pygame.draw.rect(surface, LIGHT_GRAY, panel_rect)
+        pygame.draw.rect(surface, BLACK, panel_rect, 2)
         
         # Title
-        title_text = self.font_medium.render("Robot Status", True, BLACK)
-        self.screen.blit(title_text, (panel_x + 10, panel_y + 10))
+        title_text = self._static_text["Robot Status"]
+        surface.blit(title_text, (10, 10))
         
         # Robot info
         for i, robot in enumerate(self.simulator.robots):
-            robot_y = panel_y + 40 + i * 60
+            robot_y = 40 + i * 60
             
             # Robot color indicator
             color = ROBOT_COLORS.get(robot.id, BLACK)
-            pygame.draw.circle(self.screen, color, (panel_x + 20, robot_y + 10), 8)
+            pygame.draw.circle(surface, color, (20, robot_y + 10), 8)
             
             # Robot info
             robot_text = f"Robot {robot.id} (Priority {robot.priority})"
-            text = self.font_small.render(robot_text, True, BLACK)
-            self.screen.blit(text, (panel_x + 35, robot_y))
+            text = self._render_text(self.font_small, robot_text, BLACK)
+            surface.blit(text, (35, robot_y))
             
             # Location
             if robot.position.row == 0:
@@ -290,8 +411,8 @@ class MAPFRenderer:
             else:
                 location = f"Corridor {robot.position.col}"
             
-            location_text = self.font_tiny.render(f"Location: {location}", True, BLACK)
-            self.screen.blit(location_text, (panel_x + 35, robot_y + 15))
+            location_text = self._render_text(self.font_tiny, f"Location: {location}", BLACK)
+            surface.blit(location_text, (35, robot_y + 15))
             
             # Status
             if robot.status == RobotStatus.IDLE:
@@ -301,16 +422,16 @@ class MAPFRenderer:
             else:
                 status = "Moving"
             
-            status_text = self.font_tiny.render(f"Status: {status}", True, BLACK)
-            self.screen.blit(status_text, (panel_x + 35, robot_y + 30))
+            status_text = self._render_text(self.font_tiny, f"Status: {status}", BLACK)
+            surface.blit(status_text, (35, robot_y + 30))
             
             # Remaining steps
             if robot.path:
                 remaining = len(robot.path) - robot.path_index
-                steps_text = self.font_tiny.render(f"Steps left: {remaining}", True, BLACK)
-                self.screen.blit(steps_text, (panel_x + 150, robot_y + 30))
+                steps_text = self._render_text(self.font_tiny, f"Steps left: {remaining}", BLACK)
+                surface.blit(steps_text, (150, robot_y + 30))
     
-    def _draw_instructions(self) -> None:
+    def _draw_instructions(self, surface: pygame.Surface) -> None:
         """Draw control instructions."""
         instructions = [
             "Controls:",
@@ -325,4 +446,4 @@ class MAPFRenderer:
             color = BLACK if i == 0 else DARK_GRAY
             font = self.font_small if i == 0 else self.font_tiny
             text = font.render(instruction, True, color)
-            self.screen.blit(text, (10, start_y + i * 15))
\ No newline at end of file
+            surface.blit(text, (10, start_y + i * 15))
\ No newline at end of file
@@ -4,10 +4,9 @@ Handles the discrete simulation loop and robot coordination.
 """
 
 import random
-import time
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple, Union
 from environment import Environment, Robot, Position, RobotStatus
-from solver import MAPFSolver
+from solver import MAPFSolver, PathView, STATIC
 from orders import OrderManager
 
 class MAPFSimulator:
@@ -21,8 +20,9 @@ class MAPFSimulator:
         # Simulation state
         self.is_running = False
         self.time_elapsed = 0
-        self.last_update_time = 0
         self.update_interval = 1.0  # 1 second between updates
+        self.dirty = True  # Set whenever the renderer needs to redraw
+        self.robots_dirty = True  # Set whenever a robot's position or status changes
         
         # Initialize robots
         self.robots: List[Robot] = [
@@ -43,20 +43,22 @@ class MAPFSimulator:
                 status=RobotStatus.IDLE
             )
         ]
+        
+        # Robot at each position, kept in sync as robots move
+        self._robot_by_position: Dict[Position, Robot] = {}
+        self._index_robot_positions()
     
     def update(self) -> None:
-        """Main update method called each frame."""
+        """Advance the simulation by one step; called every update_interval."""
         if not self.is_running:
             return
         
-        current_time = time.time()
-        if current_time - self.last_update_time >= self.update_interval:
-            self._simulation_step()
-            self.last_update_time = current_time
+        self._simulation_step()
     
     def _simulation_step(self) -> None:
         """Execute one simulation step."""
         self.time_elapsed += 1
+        self.dirty = True
         
         # Generate random orders occasionally
         if random.random() < 0.1:  # 10% chance per second
@@ -95,43 +97,24 @@ class MAPFSimulator:
         other_robot_paths = self._get_other_robot_paths(best_robot.id)
         
         # Plan path: current -> pickup room -> destination room
-        path_to_pickup = self.mapf_solver.find_single_robot_path(
-            best_robot, from_pos, other_robot_paths
-        )
-        
-        if not path_to_pickup:
-            return  # No path found
-        
-        # Create temporary robot at pickup position to plan second leg
-        temp_robot = Robot(
-            id=best_robot.id,
-            position=from_pos,
-            path=[],
-            path_index=0,
-            priority=best_robot.priority,
-            status=RobotStatus.MOVING
-        )
-        
-        path_to_destination = self.mapf_solver.find_single_robot_path(
-            temp_robot, to_pos, other_robot_paths
+        full_path = self.mapf_solver.find_pickup_delivery_path(
+            best_robot, from_pos, to_pos, other_robot_paths
         )
         
-        if not path_to_destination:
+        if not full_path:
             return  # No path found
         
-        # Combine paths (remove duplicate pickup position)
-        full_path = path_to_pickup[:-1] + path_to_destination
-        
         # Assign path to robot
         best_robot.path = full_path
         best_robot.path_index = 0
         best_robot.status = RobotStatus.MOVING
         best_robot.is_waiting = False
+        self.robots_dirty = True
         
         # Assign order
         self.order_manager.assign_order_to_robot(order, best_robot, self.time_elapsed)
     
-    def _get_other_robot_paths(self, exclude_robot_id: int) -> List[List[Position]]:
+    def _get_other_robot_paths(self, exclude_robot_id: int) -> List[Union[PathView, Tuple[str, Position]]]:
         """Get paths of other robots for collision avoidance."""
         other_paths = []
         
@@ -140,15 +123,11 @@ class MAPFSimulator:
                 continue
             
             if robot.status == RobotStatus.MOVING and robot.path:
-                # Include current position as time 0, then remaining path
-                current_pos = robot.position
-                remaining_path = robot.path[robot.path_index:]
-                full_path = [current_pos] + remaining_path
-                other_paths.append(full_path)
+                # Current position as time 0, then remaining path (not copied)
+                other_paths.append(PathView(robot.position, robot.path, robot.path_index))
             elif robot.status == RobotStatus.IDLE:
                 # Stationary robot occupies its position
-                stationary_path = [robot.position] * 20  # Block for 20 timesteps
-                other_paths.append(stationary_path)
+                other_paths.append((STATIC, robot.position))
         
         return other_paths
     
@@ -156,7 +135,10 @@ class MAPFSimulator:
         """Move robots along their paths with collision avoidance."""
         # Calculate intended moves for all robots
         intended_moves = {}
-        position_conflicts = {}
+        # Highest priority robot (lowest priority number) heading to each
+        # cell, indexed by row * width + col
+        width = self.env.width
+        cell_winners: List[Optional[Robot]] = [None] * (width * self.env.height)
         
         for robot in self.robots:
             if robot.status == RobotStatus.MOVING and robot.path and robot.path_index < len(robot.path):
@@ -164,32 +146,33 @@ class MAPFSimulator:
                 intended_moves[robot.id] = next_pos
                 
                 # Track position conflicts
-                pos_key = (next_pos.row, next_pos.col)
-                if pos_key not in position_conflicts:
-                    position_conflicts[pos_key] = []
-                position_conflicts[pos_key].append(robot)
+                cell = next_pos.row * width + next_pos.col
+                winner = cell_winners[cell]
+                if winner is None or robot.priority < winner.priority:
+                    cell_winners[cell] = robot
         
-        # Execute moves, handling conflicts by priority
+        # Execute moves, handling conflicts by priority. moved tracks position
+        # changes; changed also covers path_index, is_waiting and status
+        moved = False
+        changed = False
         for robot in self.robots:
             if robot.id not in intended_moves:
+                changed = changed or robot.is_waiting
                 robot.is_waiting = False
                 continue
             
             next_pos = intended_moves[robot.id]
-            pos_key = (next_pos.row, next_pos.col)
             
             # Check for conflicts
-            conflicting_robots = position_conflicts[pos_key]
-            if len(conflicting_robots) > 1:
-                # Find highest priority robot (lowest priority number)
-                highest_priority_robot = min(conflicting_robots, key=lambda r: r.priority)
-                
-                if robot.id != highest_priority_robot.id:
-                    # This robot has lower priority, so it waits
-                    robot.is_waiting = True
-                    continue
+            if cell_winners[next_pos.row * width + next_pos.col] is not robot:
+                # Another robot with higher priority takes this cell, so this one waits
+                changed = changed or not robot.is_waiting
+                robot.is_waiting = True
+                continue
             
-            # Move robot
+            # Move robot (path_index always advances, so the robot changed)
+            changed = True
+            moved = moved or robot.position != next_pos
             robot.position = next_pos
             robot.path_index += 1
             robot.is_waiting = False
@@ -204,18 +187,27 @@ class MAPFSimulator:
                 order = self.order_manager.find_order_by_robot(robot.id)
                 if order:
                     self.order_manager.complete_order(order, self.time_elapsed)
+        
+        if moved:
+            self._index_robot_positions()
+        if changed:
+            self.robots_dirty = True
+    
+    def _index_robot_positions(self) -> None:
+        """Rebuild the position -> robot lookup; the first robot listed wins a shared cell."""
+        self._robot_by_position = {robot.position: robot for robot in reversed(self.robots)}
     
     def toggle_simulation(self) -> None:
         """Toggle simulation running state."""
         self.is_running = not self.is_running
-        if self.is_running:
-            self.last_update_time = time.time()
+        self.dirty = True
     
     def reset(self) -> None:
         """Reset the simulation to initial state."""
         self.is_running = False
         self.time_elapsed = 0
-        self.last_update_time = 0
+        self.dirty = True
+        self.robots_dirty = True
         
         # Reset robots
         self.robots = [
@@ -236,36 +228,35 @@ class MAPFSimulator:
                 status=RobotStatus.IDLE
             )
         ]
+        self._index_robot_positions()
         
-        # Reset orders
+        # Reset orders and forget paths planned for the old state
         self.order_manager.reset()
+        self.mapf_solver.clear_cache()
     
     def add_manual_order(self) -> None:
         """Add a manual order."""
         self.order_manager.add_manual_order(self.time_elapsed)
+        self.dirty = True
     
     def get_robot_at_position(self, position: Position) -> Optional[Robot]:
         """Get robot at specific position."""
-        for robot in self.robots:
-            if robot.position == position:
-                return robot
-        return None
+        return self._robot_by_position.get(position)
     
     def is_position_in_robot_path(self, position: Position, robot: Robot) -> bool:
         """Check if position is in robot's remaining path."""
         if not robot.path:
             return False
         
-        remaining_path = robot.path[robot.path_index:]
-        return position in remaining_path
+        return any(robot.path[i] == position
+                   for i in range(robot.path_index, len(robot.path)))
     
     def get_path_step_number(self, position: Position, robot: Robot) -> int:
         """Get step number for position in robot's path."""
         if not robot.path:
             return 0
         
-        remaining_path = robot.path[robot.path_index:]
         try:
-            return remaining_path.index(position) + 1
+            return robot.path.index(position, robot.path_index) - robot.path_index + 1
         except ValueError:
             return 0
\ No newline at end of file
@@ -4,30 +4,160 @@ Handles collision avoidance for multiple robots.
 """
 
 import heapq
-from typing import List, Dict, Set, Tuple, Optional
-from dataclasses import dataclass, field
+from typing import List, Dict, Set, Tuple, Optional, Union
+from dataclasses import dataclass
 from environment import Environment, Position, Robot
 
+# Marker for a robot that stays put: ('STATIC', position) in other_robot_paths
+# blocks that position without materializing a path
+STATIC = 'STATIC'
+# Time steps a stationary robot blocks its position for. Idle robots only
+# move once given an order, so blocking them forever would make their cell
+# unreachable as a destination.
+STATIC_HORIZON = 20
+# Maximum number of memoized paths kept by MAPFSolver
+PATH_CACHE_SIZE = 256
+
 @dataclass
 class AStarNode:
-    """Node for A* search with time dimension."""
+    """
+    Node for A* search with time dimension.
+    
+    Kept for callers that build their own searches; _astar_core works on
+    plain tuples and does not use it.
+    """
     position: Position
     time: int
     g_cost: float
     f_cost: float
-    path: List[Position] = field(default_factory=list)
+    parent: Optional['AStarNode'] = None
     
     def __lt__(self, other):
         return self.f_cost < other.f_cost
 
+class PathView:
+    """
+    Read-only, time-indexed view of a robot's remaining path without copying it.
+    
+    Index 0 is the robot's current position; index t >= 1 is
+    path[start_index + t - 1]. Supports len() and non-negative int indexing,
+    which is all collision checks need.
+    """
+    __slots__ = ('current_pos', 'path', 'start_index')
+    
+    def __init__(self, current_pos: Position, path: List[Position], start_index: int):
+        self.current_pos = current_pos
+        self.path = path
+        self.start_index = start_index
+    
+    def __len__(self) -> int:
+        return len(self.path) - self.start_index + 1
+    
+    def __getitem__(self, t: int) -> Position:
+        if t == 0:
+            return self.current_pos
+        return self.path[self.start_index + t - 1]
+
+def _astar_core(start_cell: int, goal_cell: int,
+                neighbors: List[Tuple[Tuple[int, int], ...]], h: List[int],
+                occupied: bytearray, moves: Set[int], num_cells: int, max_time: int,
+                pickup_cell: int = -1, h_pickup: Optional[List[int]] = None) -> List[int]:
+    """
+    Space-Time A* from start_cell to goal_cell, via pickup_cell if set.
+    
+    A state is (time * num_cells + cell) * 2 + picked_up. Returns packed
+    cells from start to goal, or an empty list if no path exists.
+    """
+    heappush = heapq.heappush
+    heappop = heapq.heappop
+    inf = float('inf')
+    
+    # Before pickup, h is distance to the pickup plus pickup-to-goal
+    pickup_to_goal = h[pickup_cell] if pickup_cell >= 0 else 0
+    start_picked = 1 if pickup_cell < 0 or start_cell == pickup_cell else 0
+    start_state = start_cell * 2 + start_picked
+    start_h = h[start_cell] if start_picked else h_pickup[start_cell] + pickup_to_goal
+    
+    # Priority queue of (f_cost, g_cost, counter, state, parent_idx). The
+    # counter breaks ties before the payload is compared and indexes the entry
+    # in nodes, which keeps (state, parent_idx) so parent links survive popping
+    open_set = [(start_h, 0, 0, start_state, -1)]
+    nodes: List[Tuple[int, int]] = [(start_state, -1)]
+    # Best g-cost per reached state
+    best_g: Dict[int, int] = {start_state: 0}
+    
+    while open_set:
+        f_cost, g_cost, idx, state, parent_idx = heappop(open_set)
+        picked = state & 1
+        time, cell = divmod(state >> 1, num_cells)
+        
+        # Check if we reached the goal
+        if picked and cell == goal_cell:
+            path = [cell]
+            while parent_idx >= 0:
+                state, parent_idx = nodes[parent_idx]
+                path.append((state >> 1) % num_cells)
+            path.reverse()
+            return path
+        
+        # Skip if a cheaper route to this state was found after this push
+        if g_cost > best_g[state]:
+            continue
+        
+        # Don't search beyond max time
+        if time >= max_time:
+            continue
+        
+        # Explore neighboring cells
+        next_base = (time + 1) * num_cells
+        for next_cell, move_cost in neighbors[cell]:
+            # Check vertex collision (same cell at same time)
+            next_space = next_base + next_cell
+            if occupied[next_space]:
+                continue
+            
+            # Check edge collision (another robot moving next_cell -> cell)
+            if (next_base + cell) * num_cells + next_cell in moves:
+                continue
+            
+            # Skip unless this improves on the best known route to the state
+            next_picked = picked or next_cell == pickup_cell
+            next_state = next_space * 2 + next_picked
+            new_g_cost = g_cost + move_cost
+            if new_g_cost >= best_g.get(next_state, inf):
+                continue
+            best_g[next_state] = new_g_cost
+            
+            if next_picked:
+                h_cost = h[next_cell]
+            else:
+                h_cost = h_pickup[next_cell] + pickup_to_goal
+            next_idx = len(nodes)
+            nodes.append((next_state, idx))
+            heappush(open_set, (new_g_cost + h_cost, new_g_cost, next_idx, next_state, idx))
+    
+    return []  # No path found
+
 class SpaceTimeAStar:
     """Space-Time A* pathfinder with collision avoidance."""
     
     def __init__(self, environment: Environment):
         self.env = environment
+        
+        # Flat tables indexed by packed cell (row * width + col)
+        self._cells = [Position(row, col) for row in range(environment.height)
+                       for col in range(environment.width)]
+        self._neighbors = [
+            tuple((self._cell_index(next_pos), move_cost)
+                  for next_pos, move_cost in environment.get_neighbors(pos))
+            for pos in self._cells
+        ]
+        # _h_tables[goal_cell][cell] = heuristic distance from cell to goal
+        self._h_tables = [[environment.heuristic(pos, goal) for pos in self._cells]
+                          for goal in self._cells]
     
     def find_path(self, start: Position, goal: Position, 
-                  other_robot_paths: List[List[Position]] = None,
+                  other_robot_paths: List[Union[List[Position], Tuple[str, Position]]] = None,
                   max_time: int = 50) -> List[Position]:
         """
         Find path from start to goal avoiding collisions with other robot paths.
@@ -35,7 +165,8 @@ class SpaceTimeAStar:
         Args:
             start: Starting position
             goal: Goal position
-            other_robot_paths: List of paths for other robots (indexed by time)
+            other_robot_paths: List of paths for other robots (indexed by time),
+                or (STATIC, position) markers for robots that stay put
             max_time: Maximum time steps to search
             
         Returns:
@@ -44,99 +175,90 @@ class SpaceTimeAStar:
         if other_robot_paths is None:
             other_robot_paths = []
         
-        # Priority queue for A* search
-        open_set = []
-        heapq.heappush(open_set, AStarNode(
-            position=start,
-            time=0,
-            g_cost=0,
-            f_cost=self.env.heuristic(start, goal),
-            path=[]
-        ))
-        
-        # Closed set to avoid revisiting states
-        closed_set: Set[Tuple[Position, int]] = set()
-        
-        while open_set:
-            current = heapq.heappop(open_set)
-            
-            # Check if we reached the goal
-            if current.position == goal:
-                return current.path + [current.position]
-            
-            # Skip if already visited this state
-            state = (current.position, current.time)
-            if state in closed_set:
-                continue
-            closed_set.add(state)
-            
-            # Don't search beyond max time
-            if current.time >= max_time:
-                continue
-            
-            # Explore neighboring positions
-            for next_pos, move_cost in self.env.get_valid_moves(current.position):
-                next_time = current.time + 1
-                
-                # Check for collisions with other robots
-                if self._has_collision(current.position, next_pos, next_time, other_robot_paths):
-                    continue
-                
-                # Skip if already visited this state
-                next_state = (next_pos, next_time)
-                if next_state in closed_set:
-                    continue
-                
-                # Calculate costs
-                g_cost = current.g_cost + move_cost
-                h_cost = self.env.heuristic(next_pos, goal)
-                f_cost = g_cost + h_cost
-                
-                # Add to open set
-                heapq.heappush(open_set, AStarNode(
-                    position=next_pos,
-                    time=next_time,
-                    g_cost=g_cost,
-                    f_cost=f_cost,
-                    path=current.path + [current.position]
-                ))
-        
-        return []  # No path found
-    
-    def _has_collision(self, current_pos: Position, next_pos: Position, 
-                      next_time: int, other_robot_paths: List[List[Position]]) -> bool:
+        goal_cell = self._cell_index(goal)
+        occupied, moves = self._pack_paths(other_robot_paths, max_time)
+        path_cells = _astar_core(
+            self._cell_index(start), goal_cell, self._neighbors,
+            self._h_tables[goal_cell], occupied, moves, len(self._cells), max_time
+        )
+        return [self._cells[cell] for cell in path_cells]
+    
+    def find_pickup_delivery_path(self, start: Position, pickup: Position, goal: Position,
+                                  other_robot_paths: List[Union[List[Position], Tuple[str, Position]]] = None,
+                                  max_time: int = 50) -> List[Position]:
         """
-        Check for vertex and edge collisions with other robot paths.
+        Find a single path from start through pickup to goal avoiding collisions.
+        
+        Plans both legs in one search, so the delivery leg is timed against
+        other robots from the moment the pickup actually happens.
         
         Args:
-            current_pos: Current position
-            next_pos: Next intended position
-            next_time: Time step for the next position
-            other_robot_paths: Paths of other robots
+            start: Starting position
+            pickup: Position to visit before the goal
+            goal: Goal position
+            other_robot_paths: List of paths for other robots (indexed by time),
+                or (STATIC, position) markers for robots that stay put
+            max_time: Maximum time steps to search
             
         Returns:
-            True if there's a collision, False otherwise
+            List of positions representing the path
         """
-        for other_path in other_robot_paths:
-            # Check vertex collision (same position at same time)
-            if (next_time < len(other_path) and 
-                other_path[next_time] == next_pos):
-                return True
+        if other_robot_paths is None:
+            other_robot_paths = []
+        
+        goal_cell = self._cell_index(goal)
+        pickup_cell = self._cell_index(pickup)
+        occupied, moves = self._pack_paths(other_robot_paths, max_time)
+        path_cells = _astar_core(
+            self._cell_index(start), goal_cell, self._neighbors,
+            self._h_tables[goal_cell], occupied, moves, len(self._cells), max_time,
+            pickup_cell, self._h_tables[pickup_cell]
+        )
+        return [self._cells[cell] for cell in path_cells]
+    
+    def _cell_index(self, pos: Position) -> int:
+        """Pack a position into a cell index (row * width + col)."""
+        return pos.row * self.env.width + pos.col
+    
+    def _pack_paths(self, other_robot_paths, max_time: int) -> Tuple[bytearray, Set[int]]:
+        """
+        Flatten other robots' paths into occupancy and move tables for the search.
+        
+        Built once per query, so collision checks in the search loop are a
+        single index or set lookup regardless of how many robots there are.
+        
+        Args:
+            other_robot_paths: Paths indexed by time (lists or PathViews),
+                or (STATIC, position) markers
+            max_time: Maximum time steps to search
             
-            # Check edge collision (robots swapping positions)
-            if (next_time > 0 and 
-                next_time - 1 < len(other_path) and 
-                next_time < len(other_path)):
-                
-                other_prev = other_path[next_time - 1]
-                other_next = other_path[next_time]
-                
-                # Check if robots are swapping positions
-                if (current_pos == other_next and 
-                    next_pos == other_prev):
-                    return True
-        
-        return False
+        Returns:
+            A (max_time + 1) * num_cells bytearray, set at time * num_cells + cell
+            for every occupied cell, and the set of moves as
+            (time * num_cells + to_cell) * num_cells + from_cell
+        """
+        width = self.env.width
+        num_cells = len(self._cells)
+        occupied = bytearray((max_time + 1) * num_cells)
+        moves = set()
+        for path in other_robot_paths:
+            if isinstance(path, tuple) and path[0] == STATIC:
+                # Stationary robot occupies its cell for STATIC_HORIZON steps
+                cell = path[1].row * width + path[1].col
+                horizon = min(STATIC_HORIZON, max_time + 1)
+                for space in range(cell, horizon * num_cells, num_cells):
+                    occupied[space] = 1
+                continue
+            prev_cell = None
+            for t in range(min(len(path), max_time + 1)):
+                pos = path[t]
+                cell = pos.row * width + pos.col
+                space = t * num_cells + cell
+                occupied[space] = 1
+                if prev_cell is not None:
+                    moves.add(space * num_cells + prev_cell)
+                prev_cell = cell
+        return occupied, moves
 
 class MAPFSolver:
     """Multi-Agent Path Finding solver using prioritized planning."""
@@ -144,6 +266,9 @@ class MAPFSolver:
     def __init__(self, environment: Environment):
         self.env = environment
         self.pathfinder = SpaceTimeAStar(environment)
+        # Memoized paths by (start, [pickup,] goal, other-paths signature),
+        # evicted oldest first
+        self._cache: Dict[tuple, List[Position]] = {}
     
     def solve_multi_robot_path(self, robots: List[Robot], goals: Dict[int, Position]) -> Dict[int, List[Position]]:
         """
@@ -185,7 +310,7 @@ class MAPFSolver:
         return paths
     
     def find_single_robot_path(self, robot: Robot, goal: Position, 
-                              other_robot_paths: List[List[Position]] = None) -> List[Position]:
+                              other_robot_paths: List[Union[List[Position], Tuple[str, Position]]] = None) -> List[Position]:
         """
         Find path for a single robot avoiding other robot paths.
         
@@ -200,8 +325,66 @@ class MAPFSolver:
         if other_robot_paths is None:
             other_robot_paths = []
         
-        return self.pathfinder.find_path(
-            start=robot.position,
-            goal=goal,
-            other_robot_paths=other_robot_paths
-        )
\ No newline at end of file
+        start = robot.position
+        key = (start.row, start.col, goal.row, goal.col,
+               self._paths_signature(other_robot_paths))
+        path = self._cache.get(key)
+        if path is None:
+            path = self.pathfinder.find_path(
+                start=start,
+                goal=goal,
+                other_robot_paths=other_robot_paths
+            )
+            self._cache_path(key, path)
+        return list(path)
+    
+    def find_pickup_delivery_path(self, robot: Robot, pickup: Position, goal: Position,
+                                  other_robot_paths: List[Union[List[Position], Tuple[str, Position]]] = None) -> List[Position]:
+        """
+        Find path for a single robot via a pickup position to a goal.
+        
+        Args:
+            robot: The robot to find path for
+            pickup: Position to visit before the goal
+            goal: Goal position
+            other_robot_paths: Paths of other robots to avoid
+            
+        Returns:
+            List of positions representing the path
+        """
+        if other_robot_paths is None:
+            other_robot_paths = []
+        
+        start = robot.position
+        key = (start.row, start.col, pickup.row, pickup.col, goal.row, goal.col,
+               self._paths_signature(other_robot_paths))
+        path = self._cache.get(key)
+        if path is None:
+            path = self.pathfinder.find_pickup_delivery_path(
+                start=start,
+                pickup=pickup,
+                goal=goal,
+                other_robot_paths=other_robot_paths
+            )
+            self._cache_path(key, path)
+        return list(path)
+    
+    def clear_cache(self) -> None:
+        """Forget all memoized paths."""
+        self._cache.clear()
+    
+    def _cache_path(self, key: tuple, path: List[Position]) -> None:
+        """Memoize a path, evicting the oldest entry when the cache is full."""
+        if len(self._cache) >= PATH_CACHE_SIZE:
+            del self._cache[next(iter(self._cache))]
+        self._cache[key] = path
+    
+    @staticmethod
+    def _paths_signature(other_robot_paths) -> tuple:
+        """Hashable summary of other robots' paths (lists, PathViews or STATIC markers)."""
+        return tuple(
+            (STATIC, path[1].row, path[1].col)
+            if isinstance(path, tuple) and path[0] == STATIC
+            else tuple((path[t].row, path[t].col) for t in range(len(path)))
+            for path in other_robot_paths
+        )